@@ -124,3 +124,23 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The local-memory cache is per process, so the per-user page caches and their hit/miss
+# counters (students/cache.py) are too. Point this at a shared backend such as Redis or
+# Memcached when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            # One entry per user and cached page, so the stock 300 fills up quickly.
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Per-user dashboard/careerpath cache lifetime in seconds.
+STUDENT_CACHE_TIMEOUT = 60 * 60 * 24
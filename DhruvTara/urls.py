@@ -36,7 +36,10 @@ auth_views = [
 stud_urls = [
     path('dashboard/',sviews.dashboard,name='dashboard'),
     path('assessment/',sviews.assessment,name='assessment'),
-    path('careerpath/',sviews.careerpath,name='careerpath')
+    path('careerpath/',sviews.careerpath,name='careerpath'),
+    path('api/predict/',sviews.predict_api,name='predict_api'),
+    path('export/assessments/',sviews.export_assessments,name='export_assessments'),
+    path('metrics/cache/',sviews.cache_metrics,name='cache_metrics')
 ]
 
 
@@ -0,0 +1,100 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from .models import StudentAssessment
+
+# Per-user caches for the rendered dashboard and careerpath pages. Each entry is stored
+# under the user's id together with the version it was built from, and is dropped by the
+# StudentAssessment post_save/post_delete signals (see signals.py).
+CACHE_TIMEOUT = getattr(settings, 'STUDENT_CACHE_TIMEOUT', 60 * 60 * 24)
+CACHED_VIEWS = ('dashboard', 'careerpath')
+
+
+def _cache_key(view_name, user_id):
+    return f"students:{view_name}:{user_id}"
+
+
+def _metric_key(view_name, event):
+    return f"students:metrics:{view_name}:{event}"
+
+
+def get_assessment_version(user):
+    """
+    Returns (version, last_modified) for the user's latest assessment, or None if
+    they have not taken it. Only the id and timestamp are fetched, so this is cheap
+    enough to run on every request for conditional GET handling.
+
+    The version changes whenever the assessment is saved (via updated_at) and whenever
+    the username or first name shown on the pages changes. Last-Modified only tracks
+    the assessment, but browsers send If-None-Match too and Django checks it first.
+    """
+    if not user.is_authenticated:
+        return None
+    row = (
+        StudentAssessment.objects.filter(user=user)
+        .order_by('-created_at')
+        .values_list('id', 'updated_at')
+        .first()
+    )
+    if row is None:
+        return None
+    assessment_id, updated_at = row
+    names = hashlib.md5(f"{user.username}\0{user.first_name}".encode()).hexdigest()[:8]
+    return f"{assessment_id}-{updated_at.timestamp():.6f}-{names}", updated_at
+
+
+def make_etag(view_name, user, version):
+    return quote_etag(f"{view_name}-{user.pk}-{version}")
+
+
+def get_cached(view_name, user, version):
+    """Returns the cached payload for this user and assessment version, or None."""
+    entry = cache.get(_cache_key(view_name, user.pk))
+    if entry is not None and entry['version'] == version:
+        record_cache_event(view_name, 'hits')
+        return entry['payload']
+    record_cache_event(view_name, 'misses')
+    return None
+
+
+def set_cached(view_name, user, version, payload):
+    cache.set(_cache_key(view_name, user.pk), {'version': version, 'payload': payload}, CACHE_TIMEOUT)
+
+
+def invalidate_user_cache(user_id):
+    """Drops every cached view for the given user."""
+    cache.delete_many([_cache_key(view_name, user_id) for view_name in CACHED_VIEWS])
+
+
+def record_cache_event(view_name, event):
+    key = _metric_key(view_name, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event (or the counter was culled). If another request created it in
+        # the meantime, add() fails and the increment goes to the existing counter.
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats():
+    """
+    Returns hit/miss counts and the hit rate for each cached view. The counters live
+    in the default cache, so with the default local-memory backend they only cover
+    the process that answers the request; configure a shared CACHES backend to get
+    totals across workers.
+    """
+    stats = {}
+    for view_name in CACHED_VIEWS:
+        hits = cache.get(_metric_key(view_name, 'hits'), 0)
+        misses = cache.get(_metric_key(view_name, 'misses'), 0)
+        total = hits + misses
+        stats[view_name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return stats
@@ -0,0 +1,171 @@
+import csv
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import StudentAssessment
+
+# Columns written by the assessment export, as (header, ORM lookup) pairs.
+# Profile fields are reached through the user so assessments without a profile
+# (or without a user) are still exported, with empty profile columns.
+EXPORT_COLUMNS = [
+    ('assessment_id', 'id'),
+    ('created_at', 'created_at'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('school', 'user__userprofile__school'),
+    ('grade', 'user__userprofile__grade'),
+    ('date_of_birth', 'user__userprofile__date_of_birth'),
+    ('math_interest', 'math_interest'),
+    ('science_interest', 'science_interest'),
+    ('literature_interest', 'literature_interest'),
+    ('coding_interest', 'coding_interest'),
+    ('teamwork', 'teamwork'),
+    ('creativity', 'creativity'),
+    ('helping_interest', 'helping_interest'),
+    ('leadership', 'leadership'),
+    ('travel_interest', 'travel_interest'),
+    ('stable_job_interest', 'stable_job_interest'),
+    ('business_interest', 'business_interest'),
+    ('communication_skills', 'communication_skills'),
+    ('career_choice_1', 'career_choice_1'),
+    ('career_choice_2', 'career_choice_2'),
+    ('career_choice_3', 'career_choice_3'),
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_SIZE = 2000
+
+# Free-text columns a student controls. Values starting with one of FORMULA_PREFIXES
+# are prefixed with a quote in CSV output so spreadsheets don't evaluate them.
+USER_TEXT_COLUMNS = {'username', 'email', 'first_name', 'last_name', 'school'}
+USER_TEXT_POSITIONS = frozenset(
+    position for position, header in enumerate(EXPORT_HEADERS) if header in USER_TEXT_COLUMNS
+)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object that hands back whatever is written to it, so csv.writer
+    can format one row at a time without buffering the whole file."""
+
+    def write(self, value):
+        return value
+
+
+def parse_export_filters(params):
+    """
+    Builds the export_rows() keyword arguments from raw string parameters, as sent
+    to the staff endpoint or the management command. Accepts 'since' (ISO datetime),
+    'since_id', 'start_date' and 'end_date' (YYYY-MM-DD) and 'school'; missing or
+    empty values are ignored. Raises ValueError with a message naming the bad value.
+    """
+    filters = {'school': params.get('school') or None}
+    for param, parser in (('since', parse_datetime), ('start_date', parse_date), ('end_date', parse_date)):
+        value = params.get(param)
+        parsed = None
+        if value:
+            try:
+                parsed = parser(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValueError(f"Invalid value for '{param}': '{value}'")
+        filters[param] = parsed
+    if filters['since'] is not None and timezone.is_naive(filters['since']):
+        filters['since'] = timezone.make_aware(filters['since'])
+
+    since_id = params.get('since_id')
+    filters['since_id'] = None
+    if since_id:
+        if filters['since'] is None:
+            raise ValueError("'since_id' can only be used together with 'since'")
+        try:
+            filters['since_id'] = int(since_id)
+        except ValueError:
+            raise ValueError(f"Invalid value for 'since_id': '{since_id}'") from None
+    return filters
+
+
+def export_rows(since=None, since_id=None, start_date=None, end_date=None, school=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one tuple per assessment (in EXPORT_COLUMNS order), ordered by
+    (created_at, id). Rows are fetched one page of chunk_size at a time, each page
+    a separate query keyed on the last (created_at, id) seen. Memory use does not
+    grow with the size of the table, and no cursor is held open between pages, so
+    on SQLite a slow consumer does not block assessment writes.
+
+    - since / since_id: resume after the row with this created_at and id. Pass the
+      created_at and assessment_id of the last exported row; without since_id every
+      row created at exactly `since` is skipped.
+    - start_date / end_date: inclusive date range on created_at.
+    - school: case-insensitive exact match on the student's profile school.
+    """
+    queryset = StudentAssessment.objects.all()
+    if start_date is not None:
+        queryset = queryset.filter(created_at__date__gte=start_date)
+    if end_date is not None:
+        queryset = queryset.filter(created_at__date__lte=end_date)
+    if school:
+        queryset = queryset.filter(user__userprofile__school__iexact=school)
+    queryset = queryset.order_by('created_at', 'id').values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+
+    if since is None:
+        page_filter = Q()
+    elif since_id is None:
+        page_filter = Q(created_at__gt=since)
+    else:
+        page_filter = Q(created_at__gt=since) | Q(created_at=since, id__gt=since_id)
+
+    while True:
+        page = list(queryset.filter(page_filter)[:chunk_size])
+        yield from page
+        if len(page) < chunk_size:
+            return
+        # EXPORT_COLUMNS starts with (id, created_at).
+        last_id, last_created_at = page[-1][0], page[-1][1]
+        page_filter = Q(created_at__gt=last_created_at) | Q(created_at=last_created_at, id__gt=last_id)
+
+
+def _serialize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _escape_formula(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """Yields the export as CSV lines, header first. User-entered text that a
+    spreadsheet would read as a formula is prefixed with a quote."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for row in rows:
+        yield writer.writerow([
+            _escape_formula(value) if position in USER_TEXT_POSITIONS else _serialize_value(value)
+            for position, value in enumerate(row)
+        ])
+
+
+def stream_jsonl(rows):
+    """Yields the export as JSON Lines, one object per assessment."""
+    for row in rows:
+        record = {header: _serialize_value(value) for header, value in zip(EXPORT_HEADERS, row)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def stream_export(export_format, **filters):
+    """Returns a generator of text chunks for the requested format ('csv' or 'jsonl')."""
+    rows = export_rows(**filters)
+    if export_format == 'jsonl':
+        return stream_jsonl(rows)
+    return stream_csv(rows)
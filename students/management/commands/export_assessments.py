@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.exports import EXPORT_FORMATS, parse_export_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams every student assessment joined with the student's profile as CSV "
+        "or JSON Lines. Use --since and --since-id with the created_at and assessment_id "
+        "of the last exported row to resume or run incremental exports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="File to write to (defaults to stdout).")
+        parser.add_argument('--since', help="Only export assessments created after this ISO datetime.")
+        parser.add_argument('--since-id', help="With --since, also export assessments created at exactly that time with a higher id.")
+        parser.add_argument('--start-date', help="Only export assessments created on or after this date (YYYY-MM-DD).")
+        parser.add_argument('--end-date', help="Only export assessments created on or before this date (YYYY-MM-DD).")
+        parser.add_argument('--school', help="Only export students from this school.")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_export_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+        chunks = stream_export(options['format'], **filters)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -23,6 +23,7 @@ class StudentAssessment(models.Model):
     career_choice_3 = models.CharField(max_length=100)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user} - {self.created_at}"
\ No newline at end of file
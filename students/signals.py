@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user_cache
+from .models import StudentAssessment
+
+
+@receiver(post_save, sender=StudentAssessment)
+@receiver(post_delete, sender=StudentAssessment)
+def invalidate_assessment_cache(sender, instance, **kwargs):
+    """Clears the user's cached dashboard and careerpath whenever their assessment changes."""
+    if instance.user_id is not None:
+        invalidate_user_cache(instance.user_id)
@@ -1,3 +1,255 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from authapp.models import UserProfile
+from .cache import _cache_key, get_assessment_version, get_cached, set_cached
+from .exports import EXPORT_HEADERS, export_rows, parse_export_filters, stream_csv, stream_jsonl
+from .models import StudentAssessment
+
+
+def make_assessment(user=None, created_at=None, **overrides):
+    fields = {
+        'math_interest': 3, 'science_interest': 3, 'literature_interest': 3,
+        'coding_interest': 3, 'teamwork': 3, 'creativity': 3,
+        'helping_interest': 3, 'leadership': 3, 'travel_interest': 3,
+        'stable_job_interest': 3, 'business_interest': 3, 'communication_skills': 3,
+        'career_choice_1': 'Engineer', 'career_choice_2': 'Doctor', 'career_choice_3': 'Teacher',
+    }
+    fields.update(overrides)
+    assessment = StudentAssessment.objects.create(user=user, **fields)
+    if created_at is not None:
+        # created_at is auto_now_add, so it can only be set after the insert.
+        StudentAssessment.objects.filter(pk=assessment.pk).update(created_at=created_at)
+        assessment.refresh_from_db()
+    return assessment
+
+
+def as_dicts(rows):
+    return [dict(zip(EXPORT_HEADERS, row)) for row in rows]
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.t1 = datetime(2025, 1, 10, 9, 0, tzinfo=dt_timezone.utc)
+        self.t2 = datetime(2025, 2, 20, 9, 0, tzinfo=dt_timezone.utc)
+
+        self.alice = User.objects.create_user('alice', first_name='Alice')
+        UserProfile.objects.create(user=self.alice, school='Hill School', grade=10)
+        self.bob = User.objects.create_user('bob', first_name='=HYPERLINK("x")')
+        UserProfile.objects.create(user=self.bob, school='Lake School', grade=11)
+        self.carol = User.objects.create_user('carol')  # no profile
+
+        self.a1 = make_assessment(self.alice, self.t1)
+        self.a2 = make_assessment(self.bob, self.t2)
+        self.a3 = make_assessment(self.carol, self.t2)
+        self.a4 = make_assessment(None, self.t2)  # no user
+
+    def test_exports_rows_without_profile_or_user(self):
+        rows = as_dicts(export_rows())
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a1.pk, self.a2.pk, self.a3.pk, self.a4.pk])
+        self.assertEqual(rows[0]['school'], 'Hill School')
+        self.assertEqual(rows[2]['username'], 'carol')
+        self.assertIsNone(rows[2]['school'])
+        self.assertIsNone(rows[3]['username'])
+
+    def test_filters_by_school_and_dates(self):
+        rows = as_dicts(export_rows(school='hill school'))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a1.pk])
+
+        rows = as_dicts(export_rows(start_date=date(2025, 2, 1)))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a2.pk, self.a3.pk, self.a4.pk])
+
+        rows = as_dicts(export_rows(end_date=date(2025, 1, 10)))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a1.pk])
+
+    def test_resumes_within_rows_sharing_a_timestamp(self):
+        rows = as_dicts(export_rows(since=self.t2, since_id=self.a2.pk))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a3.pk, self.a4.pk])
+
+        rows = as_dicts(export_rows(since=self.t1))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a2.pk, self.a3.pk, self.a4.pk])
+
+    def test_pages_through_rows_sharing_a_timestamp(self):
+        rows = as_dicts(export_rows(chunk_size=1))
+        self.assertEqual([row['assessment_id'] for row in rows], [self.a1.pk, self.a2.pk, self.a3.pk, self.a4.pk])
+
+    def test_assessment_can_be_saved_during_export(self):
+        rows = export_rows(chunk_size=2)
+        first = next(rows)
+        # No cursor is held between pages, so writes go through mid-export.
+        StudentAssessment.objects.filter(pk=self.a3.pk).update(career_choice_1='Architect')
+        late = make_assessment(self.alice)
+        remaining = as_dicts(rows)
+        self.assertEqual(first[0], self.a1.pk)
+        self.assertEqual([row['assessment_id'] for row in remaining], [self.a2.pk, self.a3.pk, self.a4.pk, late.pk])
+        self.assertEqual(remaining[1]['career_choice_1'], 'Architect')
+
+    def test_parse_export_filters(self):
+        filters = parse_export_filters({'since': '2025-02-20T09:00:00', 'since_id': '5', 'start_date': '2025-01-01'})
+        self.assertEqual(filters['since'], self.t2)
+        self.assertEqual(filters['since_id'], 5)
+        self.assertEqual(filters['start_date'], date(2025, 1, 1))
+        self.assertIsNone(filters['end_date'])
+        self.assertIsNone(filters['school'])
+
+        for bad in ({'since': 'yesterday'}, {'end_date': '2025-13-01'}, {'since_id': '5'},
+                    {'since': '2025-01-01T00:00:00', 'since_id': 'x'}):
+            with self.assertRaises(ValueError):
+                parse_export_filters(bad)
+
+    def test_csv_output_escapes_formulas(self):
+        content = ''.join(stream_csv(export_rows(school='Lake School')))
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], EXPORT_HEADERS)
+        record = dict(zip(EXPORT_HEADERS, rows[1]))
+        self.assertEqual(record['first_name'], '\'=HYPERLINK("x")')
+        self.assertEqual(record['created_at'], self.t2.isoformat())
+
+    def test_jsonl_output(self):
+        lines = ''.join(stream_jsonl(export_rows())).splitlines()
+        self.assertEqual(len(lines), 4)
+        record = json.loads(lines[0])
+        self.assertEqual(record['username'], 'alice')
+        self.assertEqual(record['grade'], 10)
+        self.assertEqual(record['created_at'], self.t1.isoformat())
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command('export_assessments', '--format', 'jsonl', '--since', self.t2.isoformat(),
+                     '--since-id', str(self.a3.pk), stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record['assessment_id'] for record in records], [self.a4.pk])
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('dana', password='pass', first_name='Dana')
+        self.assessment = make_assessment(self.user)
+        self.client.force_login(self.user)
+
+    def version(self):
+        return get_assessment_version(self.user)[0]
+
+    def test_get_cached_ignores_other_versions(self):
+        set_cached('dashboard', self.user, 'v1', '<html>')
+        self.assertIsNone(get_cached('dashboard', self.user, 'v2'))
+        self.assertEqual(get_cached('dashboard', self.user, 'v1'), '<html>')
+
+    def test_version_changes_on_save_and_name_change(self):
+        version = self.version()
+        self.assessment.career_choice_1 = 'Architect'
+        self.assessment.save()
+        self.assertNotEqual(self.version(), version)
+
+        version = self.version()
+        self.user.first_name = 'Danielle'
+        self.assertNotEqual(self.version(), version)
+
+    def test_save_invalidates_cache(self):
+        set_cached('dashboard', self.user, self.version(), '<html>')
+        set_cached('careerpath', self.user, self.version(), '<html>')
+        StudentAssessment.objects.get(pk=self.assessment.pk).save()
+        self.assertIsNone(cache.get(_cache_key('dashboard', self.user.pk)))
+        self.assertIsNone(cache.get(_cache_key('careerpath', self.user.pk)))
+
+    def test_delete_invalidates_cache(self):
+        set_cached('dashboard', self.user, self.version(), '<html>')
+        self.assessment.delete()
+        self.assertIsNone(cache.get(_cache_key('dashboard', self.user.pk)))
+
+    def test_dashboard_returns_304_for_matching_etag(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.assessment.save()
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_degraded_careerpath_is_not_cached(self):
+        from . import views
+
+        def unavailable(career_name):
+            return {"id": career_name, "title": career_name, "description": views.CAREER_INFO_UNAVAILABLE,
+                    "responsibilities": [], "skills": [], "education": "N/A", "salary_range": "N/A"}
+
+        with mock.patch.object(views, 'get_career_info_from_gemini', side_effect=unavailable):
+            response = self.client.get(reverse('careerpath'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertIsNone(get_cached('careerpath', self.user, self.version()))
+
+
+class WhatIfPredictionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('erin', password='pass')
+        self.client.force_login(self.user)
+        self.answers = {field: 3 for field in (
+            'math_interest', 'science_interest', 'literature_interest', 'coding_interest',
+            'teamwork', 'creativity', 'helping_interest', 'leadership', 'travel_interest',
+            'stable_job_interest', 'business_interest', 'communication_skills',
+        )}
+
+    def test_batch_marks_moves_off_the_scale_invalid(self):
+        from .views import build_what_if_batch
+
+        batch, valid_moves = build_what_if_batch([1] * 12)
+        self.assertEqual(batch.shape, (25, 12))
+        self.assertTrue((batch[0] == 1).all())
+        for i in range(12):
+            # Row 1+2i moves feature i down (clipped back to 1), row 2+2i moves it up.
+            self.assertTrue((batch[1 + 2 * i] == 1).all())
+            self.assertEqual(batch[2 + 2 * i, i], 2)
+        self.assertFalse(valid_moves[0::2].any())
+        self.assertTrue(valid_moves[1::2].all())
+
+    def test_predict_reports_sensitivity_without_saving(self):
+        self.answers['math_interest'] = 1
+        count = StudentAssessment.objects.count()
+        response = self.client.get(reverse('predict_api'), {**self.answers, 'top_k': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        careers = [career['career'] for career in data['careers']]
+        self.assertEqual(len(careers), 2)
+
+        math = data['sensitivity']['math_interest']
+        self.assertIsNone(math['down'])
+        self.assertEqual(sorted(math['up']), sorted(careers))
+        self.assertEqual(StudentAssessment.objects.count(), count)
+
+    def test_rejects_invalid_parameters(self):
+        missing = dict(self.answers)
+        del missing['teamwork']
+        bad_requests = [
+            missing,
+            {**self.answers, 'teamwork': '0'},
+            {**self.answers, 'teamwork': '6'},
+            {**self.answers, 'teamwork': '2.5'},
+            {**self.answers, 'top_k': '0'},
+            {**self.answers, 'top_k': 'abc'},
+        ]
+        for params in bad_requests:
+            response = self.client.get(reverse('predict_api'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()['status'], 'error')
 
-# Create your tests here.
+    def test_rejects_post(self):
+        response = self.client.post(reverse('predict_api'), self.answers)
+        self.assertEqual(response.status_code, 405)
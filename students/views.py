@@ -10,9 +10,17 @@ from dotenv import load_dotenv
 from tensorflow.keras.models import load_model
 from asgiref.sync import sync_to_async
 
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import condition, require_GET
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
 from .models import StudentAssessment
+from .exports import EXPORT_FORMATS, parse_export_filters, stream_export
+from .cache import cache_stats, get_assessment_version, get_cached, make_etag, set_cached
 
 # --- 1. SETUP AND MODEL LOADING ---
 # Load environment variables for API keys
@@ -35,17 +43,91 @@ if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in environment variables. Please check your .env file.")
 genai.configure(api_key=GOOGLE_API_KEY)
 
+# Assessment form fields mapped to the PascalCase column names the model was trained on.
+# The order here is the column order expected by the scaler.
+ASSESSMENT_FEATURES = [
+    ('math_interest', 'Math_Interest'),
+    ('science_interest', 'Science_Interest'),
+    ('literature_interest', 'Literature_Interest'),
+    ('coding_interest', 'Coding_Interest'),
+    ('teamwork', 'Teamwork'),
+    ('creativity', 'Creativity'),
+    ('helping_interest', 'Helping_Interest'),
+    ('leadership', 'Leadership'),
+    ('travel_interest', 'Travel_Interest'),
+    ('stable_job_interest', 'StableJob_Interest'),
+    ('business_interest', 'Business_Interest'),
+    ('communication_skills', 'Communication_Skills'),
+]
+FEATURE_COLUMNS = [column for _, column in ASSESSMENT_FEATURES]
+ANSWER_MIN, ANSWER_MAX = 1, 5
+CAREER_LABELS = label_encoder.classes_
+
 
 # --- 2. SYNCHRONOUS VIEWS (Dashboard and Assessment) ---
 
+# Conditional GET helpers. The assessment version and the cached page are looked up once
+# per request and reused by the ETag, Last-Modified and view code. Validators are only
+# offered for pages that are in the server-side cache, so a 304 always stands for a page
+# we would serve again, and every 304 is counted as a cache hit.
+def _assessment_version(request):
+    if not hasattr(request, '_assessment_version'):
+        request._assessment_version = get_assessment_version(request.user)
+    return request._assessment_version
+
+
+def _cached_page(request, view_name):
+    attr = f'_cached_{view_name}'
+    if not hasattr(request, attr):
+        version = _assessment_version(request)
+        setattr(request, attr, get_cached(view_name, request.user, version[0]) if version else None)
+    return getattr(request, attr)
+
+
+def _etag_func(view_name):
+    def etag_func(request, *args, **kwargs):
+        if _cached_page(request, view_name) is None:
+            return None
+        return make_etag(view_name, request.user, _assessment_version(request)[0])
+    return etag_func
+
+
+def _last_modified_func(view_name):
+    def last_modified_func(request, *args, **kwargs):
+        if _cached_page(request, view_name) is None:
+            return None
+        return _assessment_version(request)[1]
+    return last_modified_func
+
+
+def _cacheable_response(request, view_name, html):
+    # Per-user pages: browsers may keep them but must revalidate with the ETag first.
+    version, last_modified = _assessment_version(request)
+    response = HttpResponse(html)
+    response['ETag'] = make_etag(view_name, request.user, version)
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@condition(etag_func=_etag_func('dashboard'), last_modified_func=_last_modified_func('dashboard'))
 def dashboard(request):
     """
     Displays the user's dashboard. If the user has completed an assessment,
     it shows the results. Otherwise, it prompts them to take it.
+    The rendered page is cached per user until their assessment changes.
     """
     if not request.user.is_authenticated:
         return redirect('login') # Or your login page name
 
+    version = _assessment_version(request)
+    if version is None:
+        return render(request, 'students/dashboard.html', {'has_completed_assessment': False})
+
+    html = _cached_page(request, 'dashboard')
+    if html is not None:
+        return _cacheable_response(request, 'dashboard', html)
+
     try:
         assessment = StudentAssessment.objects.get(user=request.user)
         
@@ -79,8 +161,11 @@ def dashboard(request):
         context = {
             'has_completed_assessment': False
         }
-        
-    return render(request, 'students/dashboard.html', context)
+        return render(request, 'students/dashboard.html', context)
+
+    html = render_to_string('students/dashboard.html', context, request=request)
+    set_cached('dashboard', request.user, version[0], html)
+    return _cacheable_response(request, 'dashboard', html)
 
 
 @login_required
@@ -95,25 +180,14 @@ def assessment(request):
         return redirect('dashboard')
 
     if request.method == "POST":
-        # --- THIS IS THE FIX ---
-        # The dictionary keys have been changed back to PascalCase to match your trained model.
+        # Keys are the PascalCase column names the model was trained on (see ASSESSMENT_FEATURES).
         student_data = {
-            'Math_Interest': int(request.POST.get('math_interest', 0)),
-            'Science_Interest': int(request.POST.get('science_interest', 0)),
-            'Literature_Interest': int(request.POST.get('literature_interest', 0)),
-            'Coding_Interest': int(request.POST.get('coding_interest', 0)),
-            'Teamwork': int(request.POST.get('teamwork', 0)),
-            'Creativity': int(request.POST.get('creativity', 0)),
-            'Helping_Interest': int(request.POST.get('helping_interest', 0)),
-            'Leadership': int(request.POST.get('leadership', 0)),
-            'Travel_Interest': int(request.POST.get('travel_interest', 0)),
-            'StableJob_Interest': int(request.POST.get('stable_job_interest', 0)),
-            'Business_Interest': int(request.POST.get('business_interest', 0)),
-            'Communication_Skills': int(request.POST.get('communication_skills', 0)),
+            column: int(request.POST.get(field, 0))
+            for field, column in ASSESSMENT_FEATURES
         }
 
-        # Convert to DataFrame. Pandas will use the dictionary keys as column names.
-        student_df = pd.DataFrame([student_data])
+        # Convert to DataFrame, with the columns in the order the scaler expects.
+        student_df = pd.DataFrame([student_data], columns=FEATURE_COLUMNS)
         
         # Scale the data and make predictions
         # This will now work because the DataFrame columns match the scaler's expectations.
@@ -167,6 +241,9 @@ def get_careers_for_user(user):
     ]
     return [career for career in careers if career]
 
+# Description returned when Gemini could not be reached; such results are never cached.
+CAREER_INFO_UNAVAILABLE = "Information could not be loaded at this time. Please try again later."
+
 # NOTE: This is now a standard SYNCHRONOUS function
 def get_career_info_from_gemini(career_name: str) -> dict:
     """Synchronously fetches detailed career information from the Gemini API."""
@@ -198,7 +275,7 @@ def get_career_info_from_gemini(career_name: str) -> dict:
         return {
             "id": career_name.lower().replace(" ", "_"),
             "title": career_name,
-            "description": "Information could not be loaded at this time. Please try again later.",
+            "description": CAREER_INFO_UNAVAILABLE,
             "responsibilities": [],
             "skills": [],
             "education": "N/A",
@@ -206,12 +283,19 @@ def get_career_info_from_gemini(career_name: str) -> dict:
         }
 
 @login_required
+@condition(etag_func=_etag_func('careerpath'), last_modified_func=_last_modified_func('careerpath'))
 # NOTE: This is now a standard SYNCHRONOUS view
 def careerpath(request):
     """
     Synchronous view to fetch a user's career recommendations and enrich
-    them with detailed information from the Gemini API.
+    them with detailed information from the Gemini API. Fully loaded pages are
+    cached per user until their assessment changes; error and fallback pages
+    are sent with no-store so they are never reused.
     """
+    html = _cached_page(request, 'careerpath')
+    if html is not None:
+        return _cacheable_response(request, 'careerpath', html)
+
     try:
         # 1. Directly fetch the user's career choices from the database.
         careers = get_careers_for_user(request.user)
@@ -240,6 +324,154 @@ def careerpath(request):
         career_data = {"status": "error", "message": "An unexpected error occurred while fetching career details."}
 
     # 4. Pass the final JSON object to the template.
-    return render(request, 'students/careerpath.html', {
+    html = render_to_string('students/careerpath.html', {
         'career_data_json': json.dumps(career_data)
-    })
\ No newline at end of file
+    }, request=request)
+
+    version = _assessment_version(request)
+    fully_loaded = career_data["status"] == "success" and all(
+        career.get("description") != CAREER_INFO_UNAVAILABLE for career in career_data["careers"]
+    )
+    if version is None or not fully_loaded:
+        response = HttpResponse(html)
+        patch_cache_control(response, no_store=True)
+        return response
+
+    set_cached('careerpath', request.user, version[0], html)
+    return _cacheable_response(request, 'careerpath', html)
+
+
+# --- 3. WHAT-IF PREDICTION API ---
+
+def build_what_if_batch(answers):
+    """
+    Builds the batch scored by the what-if API: row 0 holds the student's answers,
+    followed by one row per feature with that answer moved down by one and one row
+    with it moved up by one.
+
+    Returns (batch, valid_moves). valid_moves has one entry per perturbation row and
+    is False where the move leaves the answer scale (down from the minimum or up from
+    the maximum); those rows are clipped back to the base answers so the batch stays
+    in range, and their results should be ignored.
+    """
+    n_features = len(answers)
+    base = np.asarray(answers, dtype=np.float32)
+    batch = np.tile(base, (2 * n_features + 1, 1))
+    feature_idx = np.arange(n_features)
+    batch[1 + 2 * feature_idx, feature_idx] -= 1
+    batch[2 + 2 * feature_idx, feature_idx] += 1
+    moved = np.empty(2 * n_features, dtype=np.float32)
+    moved[0::2] = base - 1
+    moved[1::2] = base + 1
+    valid_moves = (moved >= ANSWER_MIN) & (moved <= ANSWER_MAX)
+    return np.clip(batch, ANSWER_MIN, ANSWER_MAX), valid_moves
+
+
+def predict_what_if(answers, top_k=3):
+    """
+    Scores the answers and every single-answer perturbation in one forward pass.
+    Returns the top-k careers for the answers as given, plus, per feature, the change
+    in each of those careers' probability when that answer moves down or up by one.
+    Moves that would leave the answer scale are reported as None.
+    """
+    batch, valid_moves = build_what_if_batch(answers)
+    scaled = scaler.transform(pd.DataFrame(batch, columns=FEATURE_COLUMNS))
+    # Calling the model directly skips the per-call setup that model.predict() does,
+    # which dominates the runtime for a batch this small.
+    probabilities = model(scaled.astype(np.float32), training=False).numpy()
+
+    base_probs = probabilities[0]
+    top_indices = np.argsort(base_probs)[-top_k:][::-1]
+    deltas = probabilities[1:, top_indices] - base_probs[top_indices]
+    down_deltas, up_deltas = deltas[0::2], deltas[1::2]
+    down_valid, up_valid = valid_moves[0::2], valid_moves[1::2]
+
+    def move_deltas(row, is_valid):
+        if not is_valid:
+            return None
+        return {
+            str(CAREER_LABELS[i]): round(float(row[j]) * 100, 2)
+            for j, i in enumerate(top_indices)
+        }
+
+    top_careers = [
+        {'career': str(CAREER_LABELS[i]), 'probability': round(float(base_probs[i]) * 100, 2)}
+        for i in top_indices
+    ]
+    sensitivity = {}
+    for feature_pos, (field, _) in enumerate(ASSESSMENT_FEATURES):
+        sensitivity[field] = {
+            'down': move_deltas(down_deltas[feature_pos], down_valid[feature_pos]),
+            'up': move_deltas(up_deltas[feature_pos], up_valid[feature_pos]),
+        }
+    return top_careers, sensitivity
+
+
+@login_required
+@require_GET
+def predict_api(request):
+    """
+    Read-only JSON endpoint used by the assessment sliders. Takes the 12 answers as
+    query parameters and returns the top careers and per-answer sensitivity without
+    saving anything.
+    """
+    answers = []
+    for field, _ in ASSESSMENT_FEATURES:
+        try:
+            value = int(request.GET[field])
+        except (KeyError, ValueError):
+            return JsonResponse({"status": "error", "message": f"Missing or invalid value for '{field}'."}, status=400)
+        if not ANSWER_MIN <= value <= ANSWER_MAX:
+            return JsonResponse({"status": "error", "message": f"'{field}' must be between {ANSWER_MIN} and {ANSWER_MAX}."}, status=400)
+        answers.append(value)
+
+    try:
+        top_k = int(request.GET.get('top_k', 3))
+    except ValueError:
+        top_k = None
+    if top_k is None or not 1 <= top_k <= len(CAREER_LABELS):
+        return JsonResponse({"status": "error", "message": f"'top_k' must be between 1 and {len(CAREER_LABELS)}."}, status=400)
+
+    top_careers, sensitivity = predict_what_if(answers, top_k=top_k)
+    return JsonResponse({
+        "status": "success",
+        "careers": top_careers,
+        "sensitivity": sensitivity,
+    })
+
+
+# --- 4. STAFF EXPORT ---
+
+@staff_member_required
+@require_GET
+def export_assessments(request):
+    """
+    Streams all assessments joined with student profiles as CSV or JSON Lines.
+    Supports ?format=csv|jsonl, ?start_date=/?end_date= (YYYY-MM-DD), ?school=,
+    and ?since=<ISO datetime>&since_id=<assessment id> for incremental exports.
+    The same export is available as the `export_assessments` management command.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"status": "error", "message": f"format must be one of: {', '.join(EXPORT_FORMATS)}."}, status=400)
+
+    try:
+        filters = parse_export_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    content_type = 'application/x-ndjson' if export_format == 'jsonl' else 'text/csv'
+    response = StreamingHttpResponse(stream_export(export_format, **filters), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="assessments.{export_format}"'
+    return response
+
+
+@staff_member_required
+@require_GET
+def cache_metrics(request):
+    """
+    Reports hit/miss counts and hit rates for the per-user dashboard and careerpath
+    caches. 304 responses count as hits. With the default local-memory cache the
+    numbers cover only the worker process named in the response.
+    """
+    return JsonResponse({"status": "success", "process_id": os.getpid(), "caches": cache_stats()})